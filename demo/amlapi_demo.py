@@ -23,6 +23,14 @@ try:
 
     print(response2)
 
+    # Search for several names and ID numbers at the same time
+    responses = aml.search_many([("name", "Joe Biden"), ("id", "AALH750218HBCLPC02")])
+
+    print(responses)
+
+    # Searches can also be described as dictionaries, with optional country and date of birth
+    # results = aml.search_batch([{"type": "name", "q": "Joe Biden", "country": "US"}, {"type": "id", "q": "AALH750218HBCLPC02"}])
+
 except idanalyzer.APIError as e:
     # If API returns an error, catch it
     details = e.args[0]
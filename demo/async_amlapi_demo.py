@@ -0,0 +1,37 @@
+import asyncio
+import idanalyzer
+from idanalyzer.async_api import AsyncAMLAPI
+
+
+async def main():
+    # Initialize AML API with your api key and region (US/EU)
+    async with AsyncAMLAPI("Your API Key", "US") as aml:
+
+        # Raise exceptions for API level errors
+        aml.throw_api_exception(True)
+
+        # Set AML database to all databases
+        aml.set_aml_database("")
+
+        # Search for several names at the same time
+        names = ["Joe Biden", "Vladimir Putin", "Xi Jinping"]
+        responses = await asyncio.gather(*[aml.search_by_name(name) for name in names])
+
+        for response in responses:
+            print(response)
+
+        # Search for a sanctioned ID number
+        response = await aml.search_by_id_number("AALH750218HBCLPC02")
+
+        print(response)
+
+
+try:
+    asyncio.run(main())
+
+except idanalyzer.APIError as e:
+    # If API returns an error, catch it
+    details = e.args[0]
+    print("API error code: {}, message: {}".format(details["code"], details["message"]))
+except Exception as e:
+    print(e)
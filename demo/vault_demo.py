@@ -14,6 +14,10 @@ try:
     # Get a single entry
     # response = vault.get("Vault_id")
 
+    # Go through every item created on or after 2021/02/25, fetching 100 items per request
+    # for item in vault.iter(filter=["createtime>=2021/02/25"], orderby="firstName", sort="ASC", page_size=100):
+    #     print(item)
+
     print(response)
 
 except idanalyzer.APIError as e:
@@ -0,0 +1,389 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .idanalyzer import AMLAPI, CoreAPI, DocuPass, Vault
+
+_done = object()
+
+# number of API calls run at the same time, matching the connection pool size of the shared HTTP session,
+# change it before the first API call
+max_workers = 32
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """
+    Return the thread pool running the blocking API calls, separate from the event loop's default executor
+    whose size depends on the number of CPUs rather than on how many requests can be in flight
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="idanalyzer")
+    return _executor
+
+
+async def _run(function, *args, **kwargs):
+    """
+    Run a blocking API call on the API thread pool, the calls share the pooled HTTP session
+    so up to max_workers requests awaited with asyncio.gather are in flight at the same time
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(function, *args, **kwargs))
+
+
+class _AsyncClient:
+    """
+    Wrap a synchronous API client, configuration methods such as throw_api_exception are passed through unchanged
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def __getattr__(self, name):
+        # client is missing while copying or unpickling, looking it up here again would recurse
+        if name == "client":
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.client.close()
+
+
+class AsyncCoreAPI(_AsyncClient):
+    """
+    Initialize Core API for use with asyncio, with an API key and optional region (US, EU)
+    All configuration methods of CoreAPI are available, scan methods are coroutines.
+
+    :param apikey: You API key
+    :param region: US/EU, defaults to US
+    :param config: Optional dictionary of API parameters, see CoreAPI.configure
+    :raises ValueError: Invalid input argument
+    """
+
+    def __init__(self, apikey, region="US", config=None):
+        _AsyncClient.__init__(self, CoreAPI(apikey, region, config))
+
+    async def scan(self, **options):
+        """
+        Perform scan on ID document with Core API, see CoreAPI.scan
+
+        :return Scan and verification results of ID document
+        :rtype dict
+        :raises ValueError: Invalid input argument
+        :raises APIError: API returned an error
+        """
+        return await _run(self.client.scan, **options)
+
+    async def scan_batch(self, jobs, max_workers=8):
+        """
+        Scan multiple documents concurrently with the current configuration, see CoreAPI.scan_batch
+
+        :return Scan results in the same order as the jobs
+        :rtype list
+        :raises ValueError: Invalid input argument
+        :raises APIError: API returned an error
+        """
+        return await _run(self.client.scan_batch, jobs, max_workers)
+
+
+class AsyncAMLAPI(_AsyncClient):
+    """
+    Initialize AML API for use with asyncio, with an API key, and optional region (US, EU)
+    All configuration methods of AMLAPI are available, search methods are coroutines.
+
+    :param apikey: You API key
+    :param region: API Region US/EU, defaults to US
+    :raises ValueError: Invalid input argument
+    """
+
+    def __init__(self, apikey, region="US"):
+        _AsyncClient.__init__(self, AMLAPI(apikey, region))
+
+    async def search_by_name(self, name="", country="", dob=""):
+        """
+        Search AML Database using a person or company's name or alias, see AMLAPI.search_by_name
+
+        :return AML match results
+        :rtype dict
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        return await _run(self.client.search_by_name, name, country, dob)
+
+    async def search_by_id_number(self, document_number="", country="", dob=""):
+        """
+        Search AML Database using a document number, see AMLAPI.search_by_id_number
+
+        :return AML match results
+        :rtype dict
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        return await _run(self.client.search_by_id_number, document_number, country, dob)
+
+    async def search_many(self, queries):
+        """
+        Perform multiple AML searches concurrently, see AMLAPI.search_many
+
+        :return AML match results in the same order as the queries
+        :rtype list
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        searches = []
+        for search_type, value in queries:
+            if search_type == "name":
+                searches.append(self.search_by_name(value))
+            elif search_type == "id":
+                searches.append(self.search_by_id_number(value))
+            else:
+                for search in searches:
+                    search.close()
+                raise ValueError("Invalid search type, 'name' or 'id' accepted.")
+
+        return list(await asyncio.gather(*searches))
+
+    async def search_batch(self, queries, max_workers=8):
+        """
+        Perform up to 100 AML searches described as dictionaries, see AMLAPI.search_batch
+
+        :return AML match results or errors in the same order as the queries
+        :rtype list
+        :raises ValueError: Invalid input argument
+        """
+        return await _run(self.client.search_batch, queries, max_workers)
+
+
+class AsyncDocuPass(_AsyncClient):
+    """
+    Initialize DocuPass API for use with asyncio, with an API key, company name and optional region (US, EU)
+    All configuration methods of DocuPass are available, session creation and validation methods are coroutines.
+
+    :param apikey: You API key
+    :param company_name: Your company name to display in DocuPass pages
+    :param region: US/EU, defaults to US
+    :raises ValueError: Invalid input argument
+    """
+
+    def __init__(self, apikey, company_name="My Company Name", region="US"):
+        _AsyncClient.__init__(self, DocuPass(apikey, company_name, region))
+
+    async def create_signature(self, template_id, out_format="PDF", prefill_data=None):
+        """
+        Create a DocuPass signature session, see DocuPass.create_signature
+
+        :return DocuPass signature request response
+        :rtype dict
+        :raises ValueError: Invalid input argument
+        :raises APIError: API error exception
+        """
+        return await _run(self.client.create_signature, template_id, out_format, prefill_data)
+
+    async def create_iframe(self):
+        """
+        Create a DocuPass session for embedding in web page as iframe
+
+        :return DocuPass verification request response
+        :rtype dict
+        :raises APIError: API error exception
+        """
+        return await _run(self.client.create_iframe)
+
+    async def create_mobile(self):
+        """
+        Create a DocuPass session for users to open on mobile phone, or embedding in mobile app
+
+        :return DocuPass verification request response
+        :rtype dict
+        :raises APIError: API error exception
+        """
+        return await _run(self.client.create_mobile)
+
+    async def create_redirection(self):
+        """
+        Create a DocuPass session for users to open in any browser
+
+        :return DocuPass verification request response
+        :rtype dict
+        :raises APIError: API error exception
+        """
+        return await _run(self.client.create_redirection)
+
+    async def create_live_mobile(self):
+        """
+        Create a DocuPass Live Mobile verification session for users to open on mobile phone
+
+        :return DocuPass verification request response
+        :rtype dict
+        :raises APIError: API error exception
+        """
+        return await _run(self.client.create_live_mobile)
+
+    async def validate(self, reference, hash):
+        """
+        Validate data received through DocuPass Callback against DocuPass Server to prevent request spoofing
+
+        :param reference: DocuPass Reference
+        :param hash: DocuPass callback hash
+        :return Whether validation succeeded
+        :rtype bool
+        """
+        return await _run(self.client.validate, reference, hash)
+
+
+class AsyncVault(_AsyncClient):
+    """
+    Initialize Vault API for use with asyncio, with an API key, and optional region (US, EU)
+    All methods of Vault are available as coroutines, iter is an asynchronous generator.
+
+    :param apikey: You API key
+    :param region: API Region US/EU, defaults to US
+    :raises ValueError: Invalid input argument
+    """
+
+    def __init__(self, apikey, region="US"):
+        _AsyncClient.__init__(self, Vault(apikey, region))
+
+    async def get(self, vault_id):
+        """
+        Get a single vault entry, see Vault.get
+
+        :return Vault entry data
+        :rtype dict
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        return await _run(self.client.get, vault_id)
+
+    async def get_many(self, vault_ids, max_workers=8):
+        """
+        Get multiple vault entries concurrently, see Vault.get_many
+
+        :return Vault entry data keyed by vault entry ID
+        :rtype dict
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        return await _run(self.client.get_many, vault_ids, max_workers)
+
+    async def list(self, **options):
+        """
+        List multiple vault entries, see Vault.list
+
+        :return A list of vault items
+        :rtype dict
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        return await _run(self.client.list, **options)
+
+    async def iter(self, page_size=100, **options):
+        """
+        Iterate through all vault entries matching the filter, see Vault.iter
+
+        :return Asynchronous generator of vault entries
+        :rtype async_generator
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        entries = self.client.iter(page_size, **options)
+        while True:
+            entry = await _run(next, entries, _done)
+            if entry is _done:
+                return
+            yield entry
+
+    async def list_all(self, page_size=100, **options):
+        """
+        Get all vault entries matching the filter as a list, see Vault.list_all
+
+        :return A list of vault entries
+        :rtype list
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        return await _run(self.client.list_all, page_size, **options)
+
+    async def update(self, vault_id, data=None):
+        """
+        Update vault entry with new data, see Vault.update
+
+        :return Whether updates succeeded
+        :rtype dict
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        return await _run(self.client.update, vault_id, data)
+
+    async def delete(self, vault_id):
+        """
+        Delete a single or multiple vault entries, see Vault.delete
+
+        :return Whether delete succeeded
+        :rtype dict
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        return await _run(self.client.delete, vault_id)
+
+    async def add_image(self, id, image, image_type=0, **options):
+        """
+        Add a document or face image into an existing vault entry, see Vault.add_image
+
+        :return New image object
+        :rtype dict
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        return await _run(self.client.add_image, id, image, image_type, **options)
+
+    async def delete_image(self, vault_id, image_id):
+        """
+        Delete an image from vault, see Vault.delete_image
+
+        :return Whether delete succeeded
+        :rtype dict
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        return await _run(self.client.delete_image, vault_id, image_id)
+
+    async def search_face(self, image, max_entry=10, threshold=0.5):
+        """
+        Search vault using a person's face image, see Vault.search_face
+
+        :return List of vault entries
+        :rtype dict
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        return await _run(self.client.search_face, image, max_entry, threshold)
+
+    async def train_face(self):
+        """
+        Train vault for face search
+
+        :return Face training result
+        :rtype dict
+        :raises APIError: API Error
+        """
+        return await _run(self.client.train_face)
+
+    async def training_status(self):
+        """
+        Get vault training status
+
+        :return Training status
+        :rtype dict
+        :raises APIError: API Error
+        """
+        return await _run(self.client.training_status)
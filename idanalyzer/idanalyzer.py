@@ -1,16 +1,61 @@
 import re
-import requests
 import base64
+import binascii
+import bisect
+import copy
+import gzip
+import hashlib
+import io
+import json
+import os
 import os.path
+import threading
+import time
+from collections import ChainMap, OrderedDict
+from contextlib import closing
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_URL_RE = re.compile(r'(http(s)?://.)(www\.)?[-a-zA-Z0-9@:%._+~#=]{2,256}\.[a-z]{2,6}\b([-a-zA-Z0-9@:%_+.~#?&/=]*)')
+_VAULT_FILTER_RE = re.compile(r'^\s*\w+\s*(?:!=|>=|<=|=|>|<|~)(?![=<>!~])')
+_VAULT_LIST_DEFAULTS = {"orderby": "createtime", "sort": "DESC", "limit": 10, "offset": 0}
+_VAULT_READ_ACTIONS = frozenset(("get", "list", "trainstatus"))
+_VAULT_WRITE_ACTIONS = frozenset(("update", "delete", "addimage", "deleteimage", "train"))
+_DIGITS = frozenset("0123456789")
+# tuples rather than sets, so that an unhashable argument fails the check instead of raising TypeError
+_AUTH_MODULES = (1, 2, "quick")
+_OUTPUT_FORMATS = ("url", "base64")
+_BIOMETRIC_TYPES = (1, 2)
+_IMAGE_TYPES = (0, 1)
+_HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+_AML_QUERY_KEYS = frozenset(("type", "q", "country", "dob"))
 
 
 def is_valid_url(string):
-    return re.search(r'(http(s)?://.)(www\.)?[-a-zA-Z0-9@:%._+~#=]{2,256}\.[a-z]{2,6}\b([-a-zA-Z0-9@:%_+.~#?&/=]*)',
-                     string)
+    # every match contains "://", checking for it first skips the pattern for file paths and base64 content
+    return "://" in string and _URL_RE.search(string)
 
 
 def is_hex_color(string):
-    return re.search(r'^#(?:[0-9a-fA-F]{3}){1,2}$', string)
+    return len(string) in (4, 7) and string[0] == "#" and _HEX_DIGITS.issuperset(string[1:])
+
+
+def _is_digits(string):
+    return len(string) > 0 and _DIGITS.issuperset(string)
+
+
+def _is_date(string):
+    return len(string) == 10 and string[4] == "/" and string[7] == "/" \
+        and _is_digits(string[:4]) and _is_digits(string[5:7]) and _is_digits(string[8:])
+
+
+def _is_age_range(string):
+    min_age, separator, max_age = string.partition("-")
+    return separator == "-" and _is_digits(min_age) and _is_digits(max_age)
 
 
 class APIError(Exception):
@@ -19,6 +64,456 @@ class APIError(Exception):
 
 client_library = "python-sdk"
 
+_REGION_ENDPOINTS = {
+    "US": "https://api.idanalyzer.com/",
+    "EU": "https://api-eu.idanalyzer.com/",
+}
+_AML_ENDPOINTS = dict((region, endpoint + "aml") for region, endpoint in _REGION_ENDPOINTS.items())
+
+# seconds to wait for the connection, and for the response which includes server side processing of videos
+request_timeout = (3.05, 120)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session():
+    """
+    Return the HTTP session shared by all API clients, so that connections to the API server
+    are kept alive and reused instead of negotiating a new TCP and TLS connection for every request.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                # only retry requests the server has refused (429, 503), other failures may have been processed already
+                retry_options = dict(total=4, connect=3, read=False, status=3, backoff_factor=0.3,
+                                     status_forcelist=(429, 503), respect_retry_after_header=True,
+                                     raise_on_status=False)
+                retry_methods = frozenset(["GET", "HEAD", "POST"])
+                # backoff_jitter was added in urllib3 2.0, allowed_methods replaced method_whitelist in 1.26
+                try:
+                    retry = Retry(backoff_jitter=0.2, allowed_methods=retry_methods, **retry_options)
+                except TypeError:
+                    try:
+                        retry = Retry(allowed_methods=retry_methods, **retry_options)
+                    except TypeError:
+                        retry = Retry(method_whitelist=retry_methods, **retry_options)
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=retry)
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["User-Agent"] = client_library + " " + requests.utils.default_user_agent()
+                _session = session
+    return _session
+
+
+cache_path = os.path.join(os.path.expanduser("~"), ".idanalyzer", "cache.sqlite")
+
+
+def _preconnect(session, url):
+    """
+    Send a HEAD request to the API server from a background thread, leaving a warm connection in the pool
+    of the given session, or of the shared session if None
+    """
+    def connect():
+        try:
+            (_get_session() if session is None else session).head(url, timeout=5)
+        except Exception:
+            pass
+
+    thread = threading.Thread(target=connect)
+    thread.daemon = True
+    thread.start()
+
+
+class _Base64File:
+    """
+    Read-only file object which presents the base64 encoding of another file, encoding only the part being read,
+    so that base64 content can be streamed as a multipart field without encoding the whole file in memory.
+
+    :param file_object: Binary file object to encode
+    """
+
+    def __init__(self, file_object):
+        file_object.seek(0, os.SEEK_END)
+        self.file_object = file_object
+        self.length = (file_object.tell() + 2) // 3 * 4
+        self.position = 0
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.length
+        self.position = min(max(offset, 0), self.length)
+        return self.position
+
+    def read(self, size=-1):
+        end = self.length if size is None or size < 0 else min(self.position + size, self.length)
+        # every 3 bytes of the file encode to 4 characters, read the whole groups covering the requested range
+        first, last = self.position // 4, (end + 3) // 4
+        self.file_object.seek(first * 3)
+        encoded = base64.b64encode(self.file_object.read((last - first) * 3))
+        chunk = encoded[self.position - first * 4:end - first * 4]
+        self.position += len(chunk)
+        return chunk
+
+    def close(self):
+        self.file_object.close()
+
+
+class _MultipartStream:
+    """
+    Multipart form body which reads uploaded files from disk in small chunks while the request is being sent,
+    instead of assembling the whole body in memory. Its length is known in advance, so the request is sent
+    with a Content-Length header, and it can seek back to any position for retries.
+
+    :param fields: Dictionary of form fields
+    :param files: Dictionary of field name to (file name, file object) tuples, file name None sends the content as a plain field
+    """
+
+    def __init__(self, fields, files):
+        self.boundary = binascii.hexlify(os.urandom(16)).decode("ascii")
+        self.content_type = "multipart/form-data; boundary=" + self.boundary
+        self.segments = []
+        self.offsets = []
+        self.length = 0
+        self.position = 0
+
+        for name, value in fields.items():
+            values = [value] if isinstance(value, (str, bytes)) or not hasattr(value, "__iter__") else value
+            for item in values:
+                if item is None:
+                    continue
+                if not isinstance(item, bytes):
+                    item = str(item).encode("utf-8")
+                self.__add(self.__header(name) + b"\r\n" + item + b"\r\n")
+
+        for name, (filename, file_object) in files.items():
+            file_object.seek(0, os.SEEK_END)
+            size = file_object.tell()
+            self.__add(self.__header(name, filename) + b"\r\n")
+            self.__add((file_object, size))
+            self.__add(b"\r\n")
+
+        self.__add(("--" + self.boundary + "--\r\n").encode("ascii"))
+
+    def __header(self, name, filename=None):
+        disposition = 'form-data; name="{}"'.format(self.__quote(name))
+        if filename is not None:
+            disposition += '; filename="{}"'.format(self.__quote(filename))
+        return ("--" + self.boundary + "\r\nContent-Disposition: " + disposition + "\r\n").encode("utf-8")
+
+    @staticmethod
+    def __quote(value):
+        return value.replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
+
+    def __add(self, segment):
+        self.offsets.append(self.length)
+        self.segments.append(segment)
+        self.length += len(segment) if isinstance(segment, bytes) else segment[1]
+
+    def __len__(self):
+        return self.length - self.position
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(65536)
+            if not chunk:
+                return
+            yield chunk
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.length
+        self.position = min(max(offset, 0), self.length)
+        return self.position
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.length - self.position
+
+        chunks = []
+        while size > 0 and self.position < self.length:
+            index = bisect.bisect_right(self.offsets, self.position) - 1
+            segment = self.segments[index]
+            start = self.position - self.offsets[index]
+            if isinstance(segment, bytes):
+                chunk = segment[start:start + size]
+            else:
+                file_object, file_size = segment
+                file_object.seek(start)
+                chunk = file_object.read(min(size, file_size - start))
+                if not chunk:
+                    raise IOError("Uploaded file was truncated while being sent.")
+            chunks.append(chunk)
+            size -= len(chunk)
+            self.position += len(chunk)
+
+        return b"".join(chunks)
+
+
+def _post(session, url, data, files=None, timeout=None):
+    """
+    Send a POST request with the given session, or the shared session when None. Files are streamed from disk as a multipart body.
+    When environment variable IDANALYZER_COMPRESS=1 is set, request bodies larger than 4 KB are compressed with gzip.
+    Timeout is a (connect, read) tuple in seconds, request_timeout when None.
+    """
+    if session is None:
+        session = _get_session()
+    if timeout is None:
+        timeout = request_timeout
+    headers = {}
+    if files:
+        data = _MultipartStream(data, files)
+        headers["Content-Type"] = data.content_type
+
+    if os.environ.get("IDANALYZER_COMPRESS") != "1":
+        return session.post(url, data=data, headers=headers, timeout=timeout)
+
+    import requests
+
+    request = session.prepare_request(requests.Request("POST", url, data=data, headers=headers))
+    if isinstance(request.body, (bytes, str)) and len(request.body) > 4096:
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        request.body = gzip.compress(body, 3)
+        request.headers["Content-Encoding"] = "gzip"
+        request.headers["Content-Length"] = str(len(request.body))
+    settings = session.merge_environment_settings(request.url, {}, None, None, None)
+    return session.send(request, timeout=timeout, **settings)
+
+
+def _encode_prefill_data(prefill_data):
+    """
+    Encode contract prefill data as a JSON string, a dictionary form value would otherwise be sent as its keys only
+    """
+    if not prefill_data:
+        return ""
+    if isinstance(prefill_data, dict):
+        return json.dumps(prefill_data)
+    return prefill_data
+
+
+def _decode_response(r):
+    """
+    Decode the JSON response body, using orjson when it is installed. An error response carrying an API error
+    message is returned so that it is handled like any other API error, other error responses raise HTTPError.
+    A returned result without an error therefore always comes from a successful response, and only those are cached.
+    """
+    try:
+        if orjson is not None:
+            result = orjson.loads(r.content)
+        else:
+            result = r.json()
+    except ValueError:
+        r.raise_for_status()
+        raise
+
+    if not r.ok and not (isinstance(result, dict) and result.get('error')):
+        r.raise_for_status()
+    return result
+
+
+def _resolve_source(source):
+    """
+    Tell whether an image or video source is a URL, a local file or base64 content, None if it is neither.
+    Inputs longer than a file path are never passed to the file system.
+    """
+    if is_valid_url(source):
+        return "url"
+    if len(source) < 4096 and os.path.isfile(source):
+        return "file"
+    if len(source) > 100:
+        return "base64"
+    return None
+
+
+# CoreAPI parameter, check the value must pass, error when it does not
+_CORE_VALIDATORS = {
+    "accuracy": (lambda value: value in (0, 1, 2), "Invalid accuracy, 0, 1 or 2 accepted."),
+    "authenticate_module": (lambda value: value in _AUTH_MODULES,
+                            "Invalid authentication module, 1, 2 or 'quick' accepted."),
+    "ocr_scaledown": (lambda value: value == 0 or 500 <= value <= 4000,
+                      "Invalid scale value, 0, or 500 to 4000 accepted."),
+    "biometric_threshold": (lambda value: 0 < value <= 1,
+                            "Invalid threshold value, float between 0 to 1 accepted."),
+    "outputmode": (lambda value: value in _OUTPUT_FORMATS, "Invalid output format, 'url' or 'base64' accepted."),
+    "verify_dob": (lambda value: not value or _is_date(value), "Invalid birthday format (YYYY/MM/DD)"),
+    "verify_age": (lambda value: not value or _is_age_range(value), "Invalid age range format (minAge-maxAge)"),
+}
+
+# CoreAPI.scan option, URL field, file field, base64 field, error when the source cannot be resolved
+_SCAN_SOURCES = (
+    ("document_primary", "url", "file", "file_base64",
+     "Invalid primary document image, file not found or malformed URL."),
+    ("document_secondary", "url_back", "file_back", "file_back_base64",
+     "Invalid secondary document image, file not found or malformed URL."),
+    ("biometric_photo", "faceurl", "face", "face_base64", "Invalid face image, file not found or malformed URL."),
+    ("biometric_video", "videourl", "video", "video_base64", "Invalid face video, file not found or malformed URL."),
+)
+
+
+def _hash_source(source):
+    """
+    Return the SHA-256 digest of a local file, read in chunks, or of the string itself for URL and base64 input
+    """
+    digest = hashlib.sha256()
+    if len(source) < 4096 and os.path.isfile(source):
+        with open(source, "rb") as source_file:
+            for chunk in iter(lambda: source_file.read(1 << 20), b""):
+                digest.update(chunk)
+    else:
+        digest.update(source.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _resize_image(path, max_size):
+    """
+    Return a JPEG image scaled down to fit within max_size pixels as a file object,
+    or None if the file is not a JPEG image, such as a PDF document, is already small enough,
+    or would not get any smaller. Multi-picture JPEG files taken by phones (MPO) are reduced to their first picture.
+    """
+    from PIL import Image
+
+    try:
+        image = Image.open(path)
+    except OSError:  # PIL.UnidentifiedImageError is an OSError
+        return None
+
+    with image:
+        if image.format not in ("JPEG", "MPO") or max(image.size) <= max_size:
+            return None
+        exif = image.info.get("exif", b"")
+        image.draft("RGB", (max_size, max_size))
+        image.thumbnail((max_size, max_size), getattr(Image, "Resampling", Image).LANCZOS)
+        resized = io.BytesIO()
+        image.save(resized, "JPEG", quality=88, exif=exif)
+
+    if resized.tell() >= os.path.getsize(path):
+        return None
+    resized.seek(0)
+    return resized
+
+
+class _ResultCache:
+    """
+    Thread-safe in-memory LRU cache for API results, entries expire after a fixed number of seconds.
+    Results are deep copied in and out so that callers modifying a result cannot alter the cached copy.
+    When a database path is given, results are also written through to SQLite so they survive the process.
+
+    :param ttl: Number of seconds an entry is kept
+    :param max_entries: Maximum number of entries kept in memory, least recently used entries are discarded first
+    :param path: SQLite database file for the persistent tier, defaults to None (memory only)
+    :param namespace: String separating the persistent entries of different API keys and endpoints
+    """
+
+    def __init__(self, ttl=300, max_entries=1024, path=None, namespace=""):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.namespace = namespace
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None and entry[0] >= time.time():
+                self.entries[key] = entry
+                return copy.deepcopy(entry[1])
+
+        if self.path:
+            entry = self.__disk_get(key)
+            if entry is not None:
+                with self.lock:
+                    self.__put(key, entry)
+                return copy.deepcopy(entry[1])
+
+        return None
+
+    def set(self, key, value):
+        entry = (time.time() + self.ttl, copy.deepcopy(value))
+        with self.lock:
+            self.__put(key, entry)
+
+        if self.path:
+            self.__disk_set(key, entry)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+        if self.path:
+            import sqlite3
+
+            try:
+                with closing(self.__connect()) as db, db:
+                    db.execute("DELETE FROM results WHERE namespace = ?", (self.namespace,))
+            except (sqlite3.Error, OSError):
+                pass
+
+    def __put(self, key, entry):
+        self.entries.pop(key, None)
+        self.entries[key] = entry
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def __connect(self):
+        import sqlite3
+
+        # cached results hold personal data, keep them readable by the current user only
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        if not os.path.exists(self.path):
+            os.close(os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o600))
+        db = sqlite3.connect(self.path, timeout=5)
+        db.execute("CREATE TABLE IF NOT EXISTS results "
+                   "(key TEXT PRIMARY KEY, namespace TEXT, expires REAL, value TEXT)")
+        return db
+
+    def __disk_key(self, key):
+        return hashlib.sha1(repr((self.namespace, key)).encode("utf-8")).hexdigest()
+
+    def __disk_get(self, key):
+        import sqlite3
+
+        try:
+            with closing(self.__connect()) as db:
+                row = db.execute("SELECT expires, value FROM results WHERE key = ? AND expires >= ?",
+                                 (self.__disk_key(key), time.time())).fetchone()
+        except (sqlite3.Error, OSError):
+            return None
+
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def __disk_set(self, key, entry):
+        import sqlite3
+
+        try:
+            with closing(self.__connect()) as db, db:
+                db.execute("DELETE FROM results WHERE expires < ?", (time.time(),))
+                db.execute("INSERT OR REPLACE INTO results (key, namespace, expires, value) VALUES (?, ?, ?, ?)",
+                           (self.__disk_key(key), self.namespace, entry[0], json.dumps(entry[1])))
+        except (sqlite3.Error, OSError):
+            pass
+
+
 class CoreAPI:
     """
     Initialize Core API with an API key and optional region (US, EU)
@@ -26,8 +521,10 @@ class CoreAPI:
 
     :param apikey: You API key
     :param region: US/EU, defaults to US
+    :param config: Optional dictionary of API parameters, see configure
     :raises ValueError: Invalid input argument
     """
+    __slots__ = ("config", "apikey", "throw_error", "session", "timeout", "cache", "client_resize", "apiendpoint")
     DEFAULT_CONFIG = {
         "accuracy": 2,
         "authenticate": False,
@@ -68,20 +565,22 @@ class CoreAPI:
         "client": client_library
     }
 
-    def __init__(self, apikey, region="US"):
+    def __init__(self, apikey, region="US", config=None):
         if not apikey:
             raise ValueError("Please provide an API key")
         if not region:
             raise ValueError("Please set an API region (US, EU)")
-        self.config = self.DEFAULT_CONFIG
+        # only parameters changed on this instance are stored, the rest are read from DEFAULT_CONFIG
+        self.config = ChainMap({}, self.DEFAULT_CONFIG)
         self.apikey = apikey
         self.throw_error = False
-        if region.upper() == "EU":
-            self.apiendpoint = "https://api-eu.idanalyzer.com/"
-        elif region.upper() == "US":
-            self.apiendpoint = "https://api.idanalyzer.com/"
-        else:
-            self.apiendpoint = region
+        self.session = None  # use the shared session, created on the first request
+        self.timeout = None
+        self.cache = None
+        self.client_resize = False
+        self.apiendpoint = _REGION_ENDPOINTS.get(region.upper(), region)
+        if config:
+            self.configure(**config)
 
     def throw_api_exception(self, throw_exception = False):
         """
@@ -89,13 +588,77 @@ class CoreAPI:
 
         :param throw_exception: Throw exception upon API error, defaults to false
         """
-        self.throw_error = throw_exception is True
+        self.throw_error = bool(throw_exception)
+
+    def set_timeout(self, connect=3.05, read=120):
+        """
+        Set how long to wait for the connection to the API server, and for its response, before giving up.
+        Throttled requests are retried with backoff, the timeouts apply to each attempt.
+
+        :param connect: Seconds to wait for the connection, defaults to 3.05
+        :param read: Seconds to wait for the response, which includes processing of videos, defaults to 120
+        :raises ValueError: Invalid input argument
+        """
+        if connect <= 0 or read <= 0:
+            raise ValueError("Invalid timeout, please specify positive number of seconds.")
+
+        self.timeout = (connect, read)
+
+    def preconnect(self):
+        """
+        Connect to the API server in the background, so that the first API call does not have to wait for
+        DNS lookup, TCP and TLS handshakes. Call it right after initialization to overlap it with your own work.
+        """
+        _preconnect(self.session, self.apiendpoint)
+
+    def close(self):
+        """
+        Close idle connections of a session set on this client, they are reopened automatically by the next API call.
+        Clients using the shared session leave it open, as its connections are pooled for all clients.
+        """
+        if self.session is not None:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def reset_config(self):
         """
         Reset all API configurations except API key and region.
         """
-        self.config = self.DEFAULT_CONFIG
+        self.config = ChainMap({}, self.DEFAULT_CONFIG)
+
+    def __set(self, key, value):
+        """
+        Set a parameter, or restore its default when the value is empty so that it is not stored on the instance
+        """
+        if value:
+            self.config[key] = value
+        else:
+            self.config.pop(key, None)
+
+    def enable_cache(self, enabled=False, ttl=3600, max_entries=1024):
+        """
+        Keep scan results in memory so that scanning identical images with identical settings within the given time
+        returns the previous result instead of uploading the images again. Local files are identified by a hash of
+        their content. Cached scans are not sent to the API, so they will not be saved to vault again.
+        Error responses are never cached.
+
+        :param enabled: Enable or disable result cache, defaults to False
+        :param ttl: Number of seconds a result is kept, defaults to 3600
+        :param max_entries: Maximum number of results to keep, defaults to 1024
+        """
+        self.cache = _ResultCache(ttl, max_entries) if enabled else None
+
+    def clear_cache(self):
+        """
+        Discard all cached scan results
+        """
+        if self.cache is not None:
+            self.cache.clear()
 
     def set_accuracy(self, accuracy=2):
         """
@@ -114,11 +677,10 @@ class CoreAPI:
         :param module: Authentication module version: 1, 2 or quick, defaults to 2
         :raises ValueError: Invalid input argument Invalid input argumentInvalid input argument
         """
-        self.config['authenticate'] = enabled is True
-
-        if enabled and module != 1 and module != 2 and module != 'quick':
+        if enabled and module not in _AUTH_MODULES:
             raise ValueError("Invalid authentication module, 1, 2 or 'quick' accepted.")
 
+        self.config['authenticate'] = bool(enabled)
         self.config['authenticate_module'] = module
 
     def set_ocr_image_resize(self, max_scale=2000):
@@ -134,6 +696,19 @@ class CoreAPI:
 
         self.config['ocr_scaledown'] = max_scale
 
+    def enable_client_resize(self, enabled=False):
+        """
+        Scale down local JPEG document and face images with Pillow before uploading, to the same size limit
+        set with set_ocr_image_resize, so that fewer bytes are sent. Videos and other image formats are uploaded unchanged.
+
+        :param enabled: Enable or disable client side image resizing, defaults to False
+        :raises ImportError: Pillow is not installed
+        """
+        if enabled:
+            import PIL
+
+        self.client_resize = bool(enabled)
+
     def set_biometric_threshold(self, threshold=0.4):
         """
         Set the minimum confidence score to consider faces being identical
@@ -155,11 +730,11 @@ class CoreAPI:
         :param output_format: url or base64, defaults to url
         :raises ValueError: Invalid input argument Invalid input argumentInvalid input argument
         """
-        if output_format != 'url' and output_format != 'base64':
+        if output_format not in _OUTPUT_FORMATS:
             raise ValueError("Invalid output format, 'url' or 'base64' accepted.")
 
-        self.config['outputimage'] = crop_document is True
-        self.config['outputface'] = crop_face is True
+        self.config['outputimage'] = bool(crop_document)
+        self.config['outputface'] = bool(crop_face)
         self.config['outputmode'] = output_format
 
     def enable_aml_check(self, enabled=False):
@@ -168,7 +743,7 @@ class CoreAPI:
 
         :param enabled: Enable or disable AML/PEP check
         """
-        self.config["aml_check"] = enabled is True
+        self.config["aml_check"] = bool(enabled)
 
     def set_aml_database(self, databases="au_dfat,ca_dfatd,ch_seco,eu_fsf,fr_tresor_gels_avoir,gb_hmt,ua_sfms,un_sc,us_ofac,eu_cor,eu_meps,global_politicians,interpol_red"):
         """
@@ -186,7 +761,7 @@ class CoreAPI:
 
         :param enabled: Enable or disable AML strict match mode
         """
-        self.config["aml_strict_match"] = enabled is True
+        self.config["aml_strict_match"] = bool(enabled)
 
     def enable_dualside_check(self, enabled=False):
         """
@@ -195,7 +770,7 @@ class CoreAPI:
 
         :param enabled: Enable or disable dual-side information check, defaults to False
         """
-        self.config['dualsidecheck'] = enabled is True
+        self.config['dualsidecheck'] = bool(enabled)
 
     def verify_expiry(self, enabled=False):
         """
@@ -203,7 +778,7 @@ class CoreAPI:
 
         :param enabled: Enable or disable expiry check, defaults to False
         """
-        self.config['verify_expiry'] = enabled is True
+        self.config['verify_expiry'] = bool(enabled)
 
     def verify_document_number(self, document_number):
         """
@@ -212,10 +787,7 @@ class CoreAPI:
         :param document_number: Document or personal number requiring validation
         :raises ValueError: Invalid input argument Invalid input argumentInvalid input argument
         """
-        if not document_number:
-            self.config['verify_documentno'] = ""
-        else:
-            self.config['verify_documentno'] = document_number
+        self.__set('verify_documentno', document_number)
 
     def verify_name(self, full_name):
         """
@@ -224,10 +796,7 @@ class CoreAPI:
         :param full_name: Full name requiring validation
         :raises ValueError: Invalid input argument Invalid input argument
         """
-        if not full_name:
-            self.config['verify_name'] = ""
-        else:
-            self.config['verify_name'] = full_name
+        self.__set('verify_name', full_name)
 
     def verify_dob(self, dob):
         """
@@ -236,13 +805,10 @@ class CoreAPI:
         :param dob: Date of birth in YYYY/MM/DD
         :raises ValueError: Invalid input argument
         """
-        if not dob:
-            self.config['verify_dob'] = ""
-        else:
-            if not re.search(r'^(\d{4}/\d{2}/\d{2})$', dob):
-                raise ValueError("Invalid birthday format (YYYY/MM/DD)")
+        if dob and not _is_date(dob):
+            raise ValueError("Invalid birthday format (YYYY/MM/DD)")
 
-            self.config['verify_dob'] = dob
+        self.__set('verify_dob', dob)
 
     def verify_age(self, age_range):
         """
@@ -251,13 +817,10 @@ class CoreAPI:
         :param age_range: Age range, example: 18-40
         :raises ValueError: Invalid input argument
         """
-        if not age_range:
-            self.config['verify_age'] = ""
-        else:
-            if not re.search(r'^(\d+-\d+)$', age_range):
-                raise ValueError("Invalid age range format (minAge-maxAge)")
+        if age_range and not _is_age_range(age_range):
+            raise ValueError("Invalid age range format (minAge-maxAge)")
 
-            self.config['verify_age'] = age_range
+        self.__set('verify_age', age_range)
 
     def verify_address(self, address):
         """
@@ -265,10 +828,7 @@ class CoreAPI:
 
         :param address: Address requiring validation
         """
-        if not address:
-            self.config['verify_address'] = ""
-        else:
-            self.config['verify_address'] = address
+        self.__set('verify_address', address)
 
     def verify_postcode(self, postcode):
         """
@@ -276,10 +836,7 @@ class CoreAPI:
 
         :param postcode: Postcode requiring validation
         """
-        if not postcode:
-            self.config['verify_postcode'] = ""
-        else:
-            self.config['verify_postcode'] = postcode
+        self.__set('verify_postcode', postcode)
 
     def restrict_country(self, country_codes):
         """
@@ -288,10 +845,7 @@ class CoreAPI:
 
         :param country_codes: ISO ALPHA-2 Country Code separated by comma
         """
-        if not country_codes:
-            self.config['country'] = ""
-        else:
-            self.config['country'] = country_codes
+        self.__set('country', country_codes)
 
     def restrict_state(self, states):
         """
@@ -300,10 +854,7 @@ class CoreAPI:
 
         :param states: State full name or abbreviation separated by comma
         """
-        if not states:
-            self.config['region'] = ""
-        else:
-            self.config['region'] = states
+        self.__set('region', states)
 
     def restrict_type(self, document_type="DIP"):
         """
@@ -312,10 +863,7 @@ class CoreAPI:
 
         :param document_type: P: Passport, D: Driver's License, I: Identity Card
         """
-        if not document_type:
-            self.config['type'] = ""
-        else:
-            self.config['type'] = document_type
+        self.__set('type', document_type)
 
     def enable_barcode_mode(self, enabled=False):
         """
@@ -323,7 +871,7 @@ class CoreAPI:
 
         :param enabled: Enable or disable Barcode Mode
         """
-        self.config['barcodemode'] = enabled is True
+        self.config['barcodemode'] = bool(enabled)
 
     def enable_vault(self, enabled=True, save_unrecognized=False, no_duplicate_image=False, auto_merge_document=False):
         """
@@ -335,10 +883,10 @@ class CoreAPI:
         :param no_duplicate_image: Prevent duplicated images from being saved.
         :param auto_merge_document: Merge images with same document number into a single entry inside vault.
         """
-        self.config['vault_save'] = enabled is True
-        self.config['vault_saveunrecognized'] = save_unrecognized is True
-        self.config['vault_noduplicate'] = no_duplicate_image is True
-        self.config['vault_automerge'] = auto_merge_document is True
+        self.config['vault_save'] = bool(enabled)
+        self.config['vault_saveunrecognized'] = bool(save_unrecognized)
+        self.config['vault_noduplicate'] = bool(no_duplicate_image)
+        self.config['vault_automerge'] = bool(auto_merge_document)
 
     def set_vault_data(self, data1="", data2="", data3="", data4="", data5=""):
         """
@@ -366,14 +914,12 @@ class CoreAPI:
         :param prefill_data: Dictionary or JSON string, to autofill dynamic fields in contract template.
         :raises ValueError: Invalid input argument
         """
-        if prefill_data is None:
-            prefill_data = {}
         if not template_id:
             raise ValueError("Invalid template ID")
 
         self.config['contract_generate'] = template_id
         self.config['contract_format'] = out_format
-        self.config['contract_prefill_data'] = prefill_data
+        self.config['contract_prefill_data'] = _encode_prefill_data(prefill_data)
 
     def set_parameter(self, parameter_key, parameter_value):
         """
@@ -384,6 +930,24 @@ class CoreAPI:
         """
         self.config[parameter_key] = parameter_value
 
+    def configure(self, **parameters):
+        """
+        Set several API parameters at once, for example configure(accuracy=1, authenticate=True, verify_age="18-99").
+        Parameters with a setter function are validated the same way, and nothing is changed if any value is invalid.
+        Parameters can also be passed to the constructor as a dictionary, which keeps the API parameter 'region'
+        apart from the API region argument.
+
+        :param parameters: API parameter keys and values
+        :raises ValueError: Invalid input argument
+        """
+        for key, value in parameters.items():
+            if key in _CORE_VALIDATORS:
+                check, error = _CORE_VALIDATORS[key]
+                if not check(value):
+                    raise ValueError(error)
+
+        self.config.update(parameters)
+
     def scan(self, **options):
         r"""
         Perform scan on ID document with Core API,
@@ -410,64 +974,61 @@ class CoreAPI:
         :raises ValueError: Invalid input argument
         :raises APIError: API returned an error
         """
-        payload = self.config
+        payload = dict(self.config)
         payload["apikey"] = self.apikey
+        files = {}
 
         if not options.get('document_primary'):
             raise ValueError("Primary document image required.")
 
-        if is_valid_url(options['document_primary']):
-            payload['url'] = options['document_primary']
-        elif os.path.isfile(options['document_primary']):
-            with open(options['document_primary'], "rb") as image_file:
-                payload['file_base64'] = base64.b64encode(image_file.read())
-        elif len(options['document_primary']) > 100:
-            payload['file_base64'] = options['document_primary']
-        else:
-            raise ValueError("Invalid primary document image, file not found or malformed URL.")
-
-        if options.get('document_secondary'):
-            if is_valid_url(options['document_secondary']):
-                payload['url_back'] = options['document_secondary']
-            elif os.path.isfile(options['document_secondary']):
-                with open(options['document_secondary'], "rb") as image_file:
-                    payload['file_back_base64'] = base64.b64encode(image_file.read())
-            elif len(options['document_secondary']) > 100:
-                payload['file_back_base64'] = options['document_secondary']
-            else:
-                raise ValueError("Invalid secondary document image, file not found or malformed URL.")
-
-        if options.get('biometric_photo'):
-            if is_valid_url(options['biometric_photo']):
-                payload['faceurl'] = options['biometric_photo']
-            elif os.path.isfile(options['biometric_photo']):
-                with open(options['biometric_photo'], "rb") as image_file:
-                    payload['face_base64'] = base64.b64encode(image_file.read())
-            elif len(options['biometric_photo']) > 100:
-                payload['face_base64'] = options['biometric_photo']
+        for option, url_key, file_key, base64_key, error in _SCAN_SOURCES:
+            source = options.get(option)
+            if not source:
+                continue
+
+            source_type = _resolve_source(source)
+            if source_type == "url":
+                payload[url_key] = source
+            elif source_type == "file":
+                files[file_key] = source
+            elif source_type == "base64":
+                payload[base64_key] = source
             else:
-                raise ValueError("Invalid face image, file not found or malformed URL.")
+                raise ValueError(error)
 
         if options.get('biometric_video'):
-            if is_valid_url(options['biometric_video']):
-                payload['videourl'] = options['biometric_video']
-            elif os.path.isfile(options['biometric_video']):
-                with open(options['biometric_video'], "rb") as image_file:
-                    payload['video_base64'] = base64.b64encode(image_file.read())
-            elif len(options['biometric_video']) > 100:
-                payload['video_base64'] = options['biometric_video']
-            else:
-                raise ValueError("Invalid face video, file not found or malformed URL.")
-
-            if not options.get('biometric_video_passcode') or not re.search(r'^([0-9]{4})$',
-                                                                            options['biometric_video_passcode']):
+            passcode = options.get('biometric_video_passcode')
+            if not passcode or len(passcode) != 4 or not _is_digits(passcode):
                 raise ValueError("Please provide a 4 digit passcode for video biometric verification.")
             else:
-                payload['passcode'] = options['biometric_video_passcode']
-
-        r = requests.post(self.apiendpoint, data=payload)
-        r.raise_for_status()
-        result = r.json()
+                payload['passcode'] = passcode
+
+        cache_key = None
+        if self.cache is not None:
+            sources = tuple((name, _hash_source(options[name])) for name in
+                            ('document_primary', 'document_secondary', 'biometric_photo', 'biometric_video')
+                            if options.get(name))
+            cache_key = (repr(sorted(self.config.maps[0].items())), sources, options.get('biometric_video_passcode'))
+            result = self.cache.get(cache_key)
+            if result is not None:
+                return result
+
+        # upload local files as multipart instead of base64 to avoid inflating and copying the file content
+        uploads = {}
+        try:
+            for field, path in files.items():
+                upload = None
+                if self.client_resize and field != 'video' and self.config['ocr_scaledown']:
+                    upload = _resize_image(path, self.config['ocr_scaledown'])
+                uploads[field] = (os.path.basename(path), upload or open(path, "rb"))
+            r = _post(self.session, self.apiendpoint, payload, uploads, timeout=self.timeout)
+        finally:
+            for _, upload in uploads.values():
+                upload.close()
+        result = _decode_response(r)
+
+        if cache_key is not None and not result.get('error'):
+            self.cache.set(cache_key, result)
 
         if not self.throw_error:
             return result
@@ -477,6 +1038,29 @@ class CoreAPI:
         else:
             return result
 
+    def scan_batch(self, jobs, max_workers=8):
+        """
+        Scan multiple documents concurrently with the current configuration, so that the total time is close to that of the slowest scan.
+
+        :param jobs: List of dictionaries with the keyword arguments of scan,
+            for example [{"document_primary": "id1.jpg"}, {"document_primary": "id2.jpg", "biometric_photo": "face2.jpg"}]
+        :param max_workers: Maximum number of scans in progress at the same time, defaults to 8
+        :return Scan results in the same order as the jobs
+        :rtype list
+        :raises ValueError: Invalid input argument
+        :raises APIError: API returned an error
+        """
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError("Invalid max workers, please specify a positive integer.")
+
+        if not jobs:
+            return []
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as executor:
+            return list(executor.map(lambda job: self.scan(**job), jobs))
+
 
 class DocuPass:
     """
@@ -488,6 +1072,8 @@ class DocuPass:
     :param region: US/EU, defaults to US
     :raises ValueError: Invalid input argument
     """
+    __slots__ = ("config", "apikey", "company_name", "throw_error", "session", "timeout", "local_qrcode",
+                 "apiendpoint")
     DEFAULT_CONFIG = {
         "companyname": "",
         "callbackurl": "",
@@ -546,16 +1132,14 @@ class DocuPass:
             raise ValueError("Please provide your company name")
         if not region:
             raise ValueError("Please set an API region (US, EU)")
-        self.config = self.DEFAULT_CONFIG
         self.apikey = apikey
+        self.company_name = company_name
+        self.reset_config()
         self.throw_error = False
-        self.config['companyname'] = company_name
-        if region.upper() == "EU":
-            self.apiendpoint = "https://api-eu.idanalyzer.com/"
-        elif region.upper() == 'US':
-            self.apiendpoint = "https://api.idanalyzer.com/"
-        else:
-            self.apiendpoint = region
+        self.session = None  # use the shared session, created on the first request
+        self.timeout = None
+        self.local_qrcode = False
+        self.apiendpoint = _REGION_ENDPOINTS.get(region.upper(), region)
 
     def throw_api_exception(self, throw_exception = False):
         """
@@ -563,13 +1147,58 @@ class DocuPass:
 
         :param throw_exception: Throw exception upon API error, defaults to false
         """
-        self.throw_error = throw_exception is True
+        self.throw_error = bool(throw_exception)
+
+    def set_timeout(self, connect=3.05, read=120):
+        """
+        Set how long to wait for the connection to the API server, and for its response, before giving up.
+        Throttled requests are retried with backoff, the timeouts apply to each attempt.
+
+        :param connect: Seconds to wait for the connection, defaults to 3.05
+        :param read: Seconds to wait for the response, which includes generating contract documents, defaults to 120
+        :raises ValueError: Invalid input argument
+        """
+        if connect <= 0 or read <= 0:
+            raise ValueError("Invalid timeout, please specify positive number of seconds.")
+
+        self.timeout = (connect, read)
+
+    def preconnect(self):
+        """
+        Connect to the API server in the background, so that the first API call does not have to wait for
+        DNS lookup, TCP and TLS handshakes. Call it right after initialization to overlap it with your own work.
+        """
+        _preconnect(self.session, self.apiendpoint)
+
+    def close(self):
+        """
+        Close idle connections of a session set on this client, they are reopened automatically by the next API call.
+        Clients using the shared session leave it open, as its connections are pooled for all clients.
+        """
+        if self.session is not None:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def reset_config(self):
         """
-        Reset all API configurations except API key and region.
+        Reset all API configurations except API key, company name and region.
         """
-        self.config = self.DEFAULT_CONFIG
+        # only parameters changed on this instance are stored, the rest are read from DEFAULT_CONFIG
+        self.config = ChainMap({"companyname": self.company_name}, self.DEFAULT_CONFIG)
+
+    def __set(self, key, value):
+        """
+        Set a parameter, or restore its default when the value is empty so that it is not stored on the instance
+        """
+        if value:
+            self.config[key] = value
+        else:
+            self.config.pop(key, None)
 
     def set_max_attempt(self, max_attempt=1):
         """
@@ -578,7 +1207,7 @@ class DocuPass:
         :param max_attempt: 1 to 10
         :raises ValueError: Invalid input argument
         """
-        if max_attempt not in range(1, 10):
+        if not isinstance(max_attempt, int) or not 1 <= max_attempt <= 10:
             raise ValueError("Invalid max attempt, please specify integer between 1 to 10.")
 
         self.config['maxattempt'] = max_attempt
@@ -614,7 +1243,7 @@ class DocuPass:
 
         :param: hide logo, defaults to False
         """
-        self.config['nobranding'] = hidden is True
+        self.config['nobranding'] = bool(hidden)
 
     def set_custom_html_url(self, url):
         """
@@ -680,7 +1309,7 @@ class DocuPass:
             if not 0 < minimum_score <= 1:
                 raise ValueError("Invalid minimum score, please specify float between 0 to 1.")
 
-            if enabled and module != 1 and module != 2 and module != 'quick':
+            if enabled and module not in _AUTH_MODULES:
                 raise ValueError("Invalid authentication module, 1, 2 or 'quick' accepted.")
 
             self.config['authenticate_module'] = module
@@ -698,7 +1327,7 @@ class DocuPass:
         if not enabled:
             self.config['biometric'] = 0
         else:
-            if verification_type == 1 or verification_type == 2:
+            if verification_type in _BIOMETRIC_TYPES:
                 self.config['biometric'] = verification_type
                 self.config['biometric_threshold'] = threshold
             else:
@@ -711,7 +1340,7 @@ class DocuPass:
 
         :param reusable: Set True to allow unlimited verification for a single DocuPass session, defaults to False
         """
-        self.config['reusable'] = reusable is True
+        self.config['reusable'] = bool(reusable)
 
     def set_callback_image(self, return_documentimage=True, return_faceimage=True, return_type=1):
         """
@@ -721,8 +1350,8 @@ class DocuPass:
         :param return_faceimage: Return face image in callback data, defaults to True
         :param return_type: Image type: 0=base64, 1=url, defaults to 1
         """
-        self.config['return_documentimage'] = return_documentimage is True
-        self.config['return_faceimage'] = return_faceimage is True
+        self.config['return_documentimage'] = bool(return_documentimage)
+        self.config['return_faceimage'] = bool(return_faceimage)
         self.config['return_type'] = 0 if return_type == 0 else 1
 
     def set_qrcode_format(self, foreground_color="000000", background_color="FFFFFF", size=5, margin=1):
@@ -732,7 +1361,7 @@ class DocuPass:
         :param foreground_color: Image foreground color HEX code, defaults to 000000
         :param background_color: Image background color HEX code, defaults to FFFFFF
         :param size: Image size: 1 to 50, defaults to 5
-        :param margin: Image margin: 1 to 50, defaults to 1
+        :param margin: Image margin: 0 to 50, defaults to 1
         :raises ValueError: Invalid input argument
         """
         if not is_hex_color(foreground_color):
@@ -741,10 +1370,10 @@ class DocuPass:
         if not is_hex_color(background_color):
             raise ValueError("Invalid background color HEX code")
 
-        if size not in range(1, 50):
+        if not isinstance(size, int) or not 1 <= size <= 50:
             raise ValueError("Invalid image size (1-50)")
 
-        if margin not in range(0, 50):
+        if not isinstance(margin, int) or not 0 <= margin <= 50:
             raise ValueError("Invalid margin (0-50)")
 
         self.config['qr_color'] = foreground_color
@@ -752,6 +1381,19 @@ class DocuPass:
         self.config['qr_size'] = size
         self.config['qr_margin'] = margin
 
+    def enable_local_qrcode(self, enabled=False):
+        """
+        Render the QR code locally from the DocuPass URL with segno, and return it under "qrcode" as a PNG data URI
+        instead of the link to the QR code image generated by the server. Format set with set_qrcode_format is respected.
+
+        :param enabled: Enable or disable local QR code rendering, defaults to False
+        :raises ImportError: segno is not installed
+        """
+        if enabled:
+            import segno
+
+        self.local_qrcode = bool(enabled)
+
     def enable_dualside_check(self, enabled=False):
         """
         Check if the names, document number and document type matches between the front and the back of the document
@@ -759,7 +1401,7 @@ class DocuPass:
 
         :param enabled: Enable or disable dual-side information check, defaults to False
         """
-        self.config['dualsidecheck'] = enabled is True
+        self.config['dualsidecheck'] = bool(enabled)
 
     def enable_aml_check(self, enabled=False):
         """
@@ -767,7 +1409,7 @@ class DocuPass:
 
         :param enabled: Enable or disable AML/PEP check
         """
-        self.config["aml_check"] = enabled is True
+        self.config["aml_check"] = bool(enabled)
 
     def set_aml_database(self,
                          databases="au_dfat,ca_dfatd,ch_seco,eu_fsf,fr_tresor_gels_avoir,gb_hmt,ua_sfms,un_sc,us_ofac,eu_cor,eu_meps,global_politicians,interpol_red"):
@@ -786,7 +1428,7 @@ class DocuPass:
 
         :param enabled: Enable or disable AML strict match mode
         """
-        self.config["aml_strict_match"] = enabled is True
+        self.config["aml_strict_match"] = bool(enabled)
 
     def enable_phone_verification(self, enabled=False):
         """
@@ -830,7 +1472,7 @@ class DocuPass:
 
         :param enabled: Enable or disable expiry check
         """
-        self.config['verify_expiry'] = enabled is True
+        self.config['verify_expiry'] = bool(enabled)
 
     def verify_document_number(self, document_number):
         """
@@ -839,10 +1481,7 @@ class DocuPass:
         :param document_number: Document or personal number requiring validation
         :raises ValueError: Invalid input argument
         """
-        if not document_number:
-            self.config['verify_documentno'] = ""
-        else:
-            self.config['verify_documentno'] = document_number
+        self.__set('verify_documentno', document_number)
 
     def verify_name(self, full_name):
         """
@@ -851,10 +1490,7 @@ class DocuPass:
         :param full_name: Full name requiring validation
         :raises ValueError: Invalid input argument
         """
-        if not full_name:
-            self.config['verify_name'] = ""
-        else:
-            self.config['verify_name'] = full_name
+        self.__set('verify_name', full_name)
 
     def verify_dob(self, dob):
         """
@@ -863,13 +1499,10 @@ class DocuPass:
         :param dob: Date of birth in YYYY/MM/DD
         :raises ValueError: Invalid input argument
         """
-        if not dob:
-            self.config['verify_dob'] = ""
-        else:
-            if not re.search(r'^(\d{4}/\d{2}/\d{2})$', dob):
-                raise ValueError("Invalid birthday format (YYYY/MM/DD)")
+        if dob and not _is_date(dob):
+            raise ValueError("Invalid birthday format (YYYY/MM/DD)")
 
-            self.config['verify_dob'] = dob
+        self.__set('verify_dob', dob)
 
     def verify_age(self, age_range="18-99"):
         """
@@ -878,13 +1511,10 @@ class DocuPass:
         :param age_range: Age range, example: 18-40
         :raises ValueError: Invalid input argument
         """
-        if not age_range:
-            self.config['verify_age'] = ""
-        else:
-            if not re.search(r'^(\d+-\d+)$', age_range):
-                raise ValueError("Invalid age range format (minAge-maxAge)")
+        if age_range and not _is_age_range(age_range):
+            raise ValueError("Invalid age range format (minAge-maxAge)")
 
-            self.config['verify_age'] = age_range
+        self.__set('verify_age', age_range)
 
     def verify_address(self, address):
         """
@@ -892,10 +1522,7 @@ class DocuPass:
 
         :param address: Address requiring validation
         """
-        if not address:
-            self.config['verify_address'] = ""
-        else:
-            self.config['verify_address'] = address
+        self.__set('verify_address', address)
 
     def verify_postcode(self, postcode):
         """
@@ -903,10 +1530,7 @@ class DocuPass:
 
         :param postcode: Postcode requiring validation
         """
-        if not postcode:
-            self.config['verify_postcode'] = ""
-        else:
-            self.config['verify_postcode'] = postcode
+        self.__set('verify_postcode', postcode)
 
     def restrict_country(self, country_codes):
         """
@@ -915,10 +1539,7 @@ class DocuPass:
 
         :param country_codes: ISO ALPHA-2 Country Code separated by comma
         """
-        if not country_codes:
-            self.config['documentcountry'] = ""
-        else:
-            self.config['documentcountry'] = country_codes
+        self.__set('documentcountry', country_codes)
 
     def restrict_state(self, states):
         """
@@ -927,10 +1548,7 @@ class DocuPass:
 
         :param states: State full name or abbreviation separated by comma
         """
-        if not states:
-            self.config['documentregion'] = ""
-        else:
-            self.config['documentregion'] = states
+        self.__set('documentregion', states)
 
     def restrict_type(self, document_type="DIP"):
         """
@@ -938,10 +1556,7 @@ class DocuPass:
 
         :param document_type: P: Passport, D: Driver's License, I: Identity Card, defaults to DIP
         """
-        if not document_type:
-            self.config['documenttype'] = ""
-        else:
-            self.config['documenttype'] = document_type
+        self.__set('documenttype', document_type)
 
     def enable_vault(self, enabled=True):
         """
@@ -950,7 +1565,7 @@ class DocuPass:
 
         :param enabled Enable or disable Vault, defaults to True
         """
-        self.config['vault_save'] = enabled is True
+        self.config['vault_save'] = bool(enabled)
 
     def set_parameter(self, parameter_key, parameter_value):
         """
@@ -970,14 +1585,12 @@ class DocuPass:
         :param prefill_data: Dictionary or JSON string, to autofill dynamic fields in contract template.
         :raises ValueError: Invalid input argument
         """
-        if prefill_data is None:
-            prefill_data = {}
         if not template_id:
             raise ValueError("Invalid template ID")
         self.config['contract_sign'] = ""
         self.config['contract_generate'] = template_id
         self.config['contract_format'] = out_format
-        self.config['contract_prefill_data'] = prefill_data
+        self.config['contract_prefill_data'] = _encode_prefill_data(prefill_data)
 
     def sign_contract(self, template_id, out_format="PDF", prefill_data=None):
         """
@@ -988,14 +1601,12 @@ class DocuPass:
         :param prefill_data: Dictionary or JSON string, to autofill dynamic fields in contract template.
         :raises ValueError: Invalid input argument
         """
-        if prefill_data is None:
-            prefill_data = {}
         if not template_id:
             raise ValueError("Invalid template ID")
         self.config['contract_generate'] = ""
         self.config['contract_sign'] = template_id
         self.config['contract_format'] = out_format
-        self.config['contract_prefill_data'] = prefill_data
+        self.config['contract_prefill_data'] = _encode_prefill_data(prefill_data)
 
     def create_signature(self,  template_id, out_format="PDF", prefill_data=None):
         """
@@ -1009,19 +1620,19 @@ class DocuPass:
         :raises ValueError: Invalid input argument
         :raises APIError: API error exception
         """
-        if prefill_data is None:
-            prefill_data = {}
         if not template_id:
             raise ValueError("Invalid template ID")
-        payload = self.config
+        payload = dict(self.config)
         payload["apikey"] = self.apikey
         payload["template_id"] = template_id
         payload['contract_format'] = out_format
-        payload['contract_prefill_data'] = prefill_data
+        payload['contract_prefill_data'] = _encode_prefill_data(prefill_data)
 
-        r = requests.post(self.apiendpoint + "docupass/sign", data=payload)
-        r.raise_for_status()
-        result = r.json()
+        r = _post(self.session, self.apiendpoint + "docupass/sign", payload, timeout=self.timeout)
+        result = _decode_response(r)
+
+        if self.local_qrcode and result.get('url'):
+            result['qrcode'] = self.__render_qrcode(result['url'])
 
         if not self.throw_error:
             return result
@@ -1077,13 +1688,15 @@ class DocuPass:
 
     def __create(self, docupass_module):
 
-        payload = self.config
+        payload = dict(self.config)
         payload["apikey"] = self.apikey
         payload["type"] = docupass_module
 
-        r = requests.post(self.apiendpoint + "docupass/create", data=payload)
-        r.raise_for_status()
-        result = r.json()
+        r = _post(self.session, self.apiendpoint + "docupass/create", payload, timeout=self.timeout)
+        result = _decode_response(r)
+
+        if self.local_qrcode and result.get('url'):
+            result['qrcode'] = self.__render_qrcode(result['url'])
 
         if not self.throw_error:
             return result
@@ -1093,6 +1706,17 @@ class DocuPass:
         else:
             return result
 
+    def __render_qrcode(self, url):
+        import segno
+
+        dark = self.config['qr_color'] or "000000"
+        light = self.config['qr_bgcolor'] or "FFFFFF"
+        buffer = io.BytesIO()
+        segno.make(url, error='m').save(buffer, kind='png', scale=self.config['qr_size'] or 5,
+                                        border=self.config['qr_margin'] if self.config['qr_margin'] != "" else 1,
+                                        dark="#" + dark.lstrip("#"), light="#" + light.lstrip("#"))
+        return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
     def validate(self, reference, hash):
         """
         Validate data received through DocuPass Callback against DocuPass Server to prevent request spoofing
@@ -1110,9 +1734,8 @@ class DocuPass:
             "client": client_library
         }
 
-        r = requests.post(self.apiendpoint + "docupass/validate", data=payload)
-        r.raise_for_status()
-        result = r.json()
+        r = _post(self.session, self.apiendpoint + "docupass/validate", payload, timeout=self.timeout)
+        result = _decode_response(r)
         return result.get('success')
 
 
@@ -1125,6 +1748,7 @@ class Vault:
     :param region: API Region US/EU, defaults to US
     :raises ValueError: Invalid input argument
     """
+    __slots__ = ("apikey", "throw_error", "session", "timeout", "cache", "apiendpoint")
 
     def __init__(self, apikey, region="US"):
         if not apikey:
@@ -1133,12 +1757,10 @@ class Vault:
             raise ValueError("Please set an API region (US, EU)")
         self.apikey = apikey
         self.throw_error = False
-        if region.upper() == 'EU':
-            self.apiendpoint = "https://api-eu.idanalyzer.com/"
-        elif region.upper() == "US":
-            self.apiendpoint = "https://api.idanalyzer.com/"
-        else:
-            self.apiendpoint = region
+        self.session = None  # use the shared session, created on the first request
+        self.timeout = None
+        self.cache = None
+        self.apiendpoint = _REGION_ENDPOINTS.get(region.upper(), region)
 
     def throw_api_exception(self, throw_exception = False):
         """
@@ -1146,7 +1768,66 @@ class Vault:
 
         :param throw_exception: Throw exception upon API error, defaults to false
         """
-        self.throw_error = throw_exception is True
+        self.throw_error = bool(throw_exception)
+
+    def set_timeout(self, connect=3.05, read=120):
+        """
+        Set how long to wait for the connection to the API server, and for its response, before giving up.
+        Throttled requests are retried with backoff, the timeouts apply to each attempt.
+
+        :param connect: Seconds to wait for the connection, defaults to 3.05
+        :param read: Seconds to wait for the response, which includes processing of uploaded images, defaults to 120
+        :raises ValueError: Invalid input argument
+        """
+        if connect <= 0 or read <= 0:
+            raise ValueError("Invalid timeout, please specify positive number of seconds.")
+
+        self.timeout = (connect, read)
+
+    def preconnect(self):
+        """
+        Connect to the API server in the background, so that the first API call does not have to wait for
+        DNS lookup, TCP and TLS handshakes. Call it right after initialization to overlap it with your own work.
+        """
+        _preconnect(self.session, self.apiendpoint)
+
+    def close(self):
+        """
+        Close idle connections of a session set on this client, they are reopened automatically by the next API call.
+        Clients using the shared session leave it open, as its connections are pooled for all clients.
+        """
+        if self.session is not None:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def enable_cache(self, enabled=False, ttl=30, max_entries=1024):
+        """
+        Keep the results of get, list and training_status in memory so that repeating an identical request within
+        the given time is answered locally. The cache is cleared whenever this client changes the vault, but changes
+        made elsewhere, for example new entries saved by Core API, are only seen once the results expire.
+        Set environment variable IDANALYZER_NO_CACHE=1 to disable caching regardless of this setting.
+
+        :param enabled: Enable or disable result cache, defaults to False
+        :param ttl: Number of seconds a result is kept, defaults to 30
+        :param max_entries: Maximum number of results to keep in memory, defaults to 1024
+        """
+        if not enabled or os.environ.get("IDANALYZER_NO_CACHE") == "1":
+            self.cache = None
+            return
+
+        self.cache = _ResultCache(ttl, max_entries)
+
+    def clear_cache(self):
+        """
+        Discard all cached results
+        """
+        if self.cache is not None:
+            self.cache.clear()
 
     def get(self, vault_id):
         """
@@ -1163,6 +1844,32 @@ class Vault:
 
         return self.__api("get", {"id": vault_id})
 
+    def get_many(self, vault_ids, max_workers=8):
+        """
+        Get multiple vault entries, the requests are sent concurrently
+
+        :param vault_ids: List of vault entry IDs
+        :param max_workers: Maximum number of requests in progress at the same time, defaults to 8
+        :return Vault entry data keyed by vault entry ID
+        :rtype dict
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError("Invalid max workers, please specify a positive integer.")
+
+        for vault_id in vault_ids:
+            if not vault_id:
+                raise ValueError("Vault entry ID required.")
+
+        if not vault_ids:
+            return {}
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(vault_ids))) as executor:
+            return dict(zip(vault_ids, executor.map(self.get, vault_ids)))
+
     def list(self, **options):
         r"""
         List multiple vault entries with optional filter, sorting and paging arguments
@@ -1194,29 +1901,66 @@ class Vault:
             if not isinstance(options['filter'], list) or len(options['filter']) > 5:
                 raise ValueError("Filter must be an array and must not exceed maximum 5 filter strings.")
 
+            for statement in options['filter']:
+                if not isinstance(statement, str) or not _VAULT_FILTER_RE.match(statement):
+                    raise ValueError("Invalid filter statement: {}".format(statement))
+
             payload['filter'] = options['filter']
 
-        if options.get('orderby'):
-            payload['orderby'] = options['orderby']
-        else:
-            payload['orderby'] = "createtime"
+        for key, default in _VAULT_LIST_DEFAULTS.items():
+            payload[key] = options.get(key) or default
 
-        if options.get('sort'):
-            payload['sort'] = options['sort']
-        else:
-            payload['sort'] = "DESC"
+        return self.__api("list", payload)
 
-        if options.get('limit'):
-            payload['limit'] = options['limit']
-        else:
-            payload['limit'] = 10
+    def iter(self, page_size=100, **options):
+        r"""
+        Iterate through all vault entries matching the filter, entries are fetched from the API in pages of page_size
+        so that traversing many entries takes far fewer requests than paging with list()
 
-        if options.get('offset'):
-            payload['offset'] = options['offset']
-        else:
-            payload['offset'] = 0
+        :param page_size: Number of entries fetched per request, defaults to 100
+        :param \**options:
+            Same filter, orderby, sort and offset arguments as list()
 
-        return self.__api("list", payload)
+        :return Generator of vault entries
+        :rtype generator
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        if not isinstance(page_size, int) or page_size < 1:
+            raise ValueError("Invalid page size, please specify a positive integer.")
+
+        return self.__iter_pages(page_size, options)
+
+    def __iter_pages(self, page_size, options):
+        offset = options.get('offset') or 0
+        while True:
+            result = self.list(filter=options.get('filter'), orderby=options.get('orderby'), sort=options.get('sort'),
+                               limit=page_size, offset=offset)
+            if result.get('error'):
+                raise APIError(result['error'])
+
+            items = result.get('items') or []
+            for item in items:
+                yield item
+
+            if not items or len(items) < page_size:
+                return
+            offset += len(items)
+
+    def list_all(self, page_size=100, **options):
+        r"""
+        Get all vault entries matching the filter as a list, see iter()
+
+        :param page_size: Number of entries fetched per request, defaults to 100
+        :param \**options:
+            Same filter, orderby, sort and offset arguments as list()
+
+        :return A list of vault entries
+        :rtype list
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        return list(self.iter(page_size, **options))
 
     def update(self, vault_id, data=None):
         """
@@ -1238,8 +1982,7 @@ class Vault:
         if len(data) < 1:
             raise ValueError("Minimum one set of data required.")
 
-        data['id'] = vault_id
-        return self.__api("update", data)
+        return self.__api("update", dict(data, id=vault_id))
 
     def delete(self, vault_id):
         """
@@ -1256,31 +1999,36 @@ class Vault:
 
         return self.__api("delete", {"id": vault_id})
 
-    def add_image(self, id, image, type=0):
+    def add_image(self, id, image, image_type=0, **options):
         """
         Add a document or face image into an existing vault entry
 
         :param id: Vault entry ID
         :param image: Image file path, base64 content or URL
-        :param type: Type of image: 0 = document, 1 = person
+        :param image_type: Type of image: 0 = document, 1 = person, also accepted as keyword argument type
         :return New image object
         :rtype dict
         :raises ValueError: Invalid input argument
         :raises APIError: API Error
         """
+        image_type = options.pop("type", image_type)
+        if options:
+            raise TypeError("add_image() got unexpected keyword arguments: " + ", ".join(options))
+
         if not id:
             raise ValueError("Vault entry ID required.")
 
-        if type != 0 and type != 1:
+        if image_type not in _IMAGE_TYPES:
             raise ValueError("Invalid image type, 0 or 1 accepted.")
 
-        payload = {"id": id, "type": type}
-        if is_valid_url(image):
+        payload = {"id": id, "type": image_type}
+        source_type = _resolve_source(image)
+        if source_type == "url":
             payload['imageurl'] = image
-        elif os.path.isfile(image):
-            with open(image, "rb") as image_file:
-                payload['image'] = base64.b64encode(image_file.read())
-        elif len(image) > 100:
+        elif source_type == "file":
+            # sent as base64 text like other image content, encoded while the request is streamed
+            return self.__api("addimage", payload, {"image": (None, _Base64File(open(image, "rb")))})
+        elif source_type == "base64":
             payload['image'] = image
         else:
             raise ValueError("Invalid image, file not found or malformed URL.")
@@ -1319,12 +2067,13 @@ class Vault:
         :raises APIError: API Error
         """
         payload = {"maxentry": max_entry, "threshold": threshold}
-        if is_valid_url(image):
+        source_type = _resolve_source(image)
+        if source_type == "url":
             payload['imageurl'] = image
-        elif os.path.isfile(image):
-            with open(image, "rb") as image_file:
-                payload['image'] = base64.b64encode(image_file.read())
-        elif len(image) > 100:
+        elif source_type == "file":
+            # sent as base64 text like other image content, encoded while the request is streamed
+            return self.__api("searchface", payload, {"image": (None, _Base64File(open(image, "rb")))})
+        elif source_type == "base64":
             payload['image'] = image
         else:
             raise ValueError("Invalid image, file not found or malformed URL.")
@@ -1353,15 +2102,30 @@ class Vault:
         """
         return self.__api("trainstatus")
 
-    def __api(self, action, payload=None):
-        if not payload:
-            payload = {}
+    def __api(self, action, payload=None, files=None):
+        payload = dict(payload or ())
+
+        cache_key = None
+        if self.cache is not None:
+            if action in _VAULT_READ_ACTIONS:
+                cache_key = (action, repr(sorted(payload.items())))
+                result = self.cache.get(cache_key)
+                if result is not None:
+                    return result
+            elif action in _VAULT_WRITE_ACTIONS:
+                self.cache.clear()
 
         payload['apikey'] = self.apikey
         payload['client'] = client_library
-        r = requests.post(self.apiendpoint + "vault/" + action, data=payload)
-        r.raise_for_status()
-        result = r.json()
+        try:
+            r = _post(self.session, self.apiendpoint + "vault/" + action, payload, files, timeout=self.timeout)
+        finally:
+            for _, upload in (files or {}).values():
+                upload.close()
+        result = _decode_response(r)
+
+        if cache_key is not None and not result.get('error'):
+            self.cache.set(cache_key, result)
 
         if not self.throw_error:
             return result
@@ -1382,6 +2146,8 @@ class AMLAPI:
     :param region: API Region US/EU, defaults to US
     :raises ValueError: Invalid input argument
     """
+    __slots__ = ("apikey", "throw_error", "session", "timeout", "AMLDatabases", "AMLEntityType", "cache", "apiendpoint")
+
     def __init__(self, apikey, region="US"):
         if not apikey:
             raise ValueError("Please provide an API key")
@@ -1389,14 +2155,12 @@ class AMLAPI:
             raise ValueError("Please set an API region (US, EU)")
         self.apikey = apikey
         self.throw_error = False
+        self.session = None  # use the shared session, created on the first request
+        self.timeout = None
         self.AMLDatabases = ""
         self.AMLEntityType = ""
-        if region.upper() == 'EU':
-            self.apiendpoint = "https://api-eu.idanalyzer.com/aml"
-        elif region.upper() == "US":
-            self.apiendpoint = "https://api.idanalyzer.com/aml"
-        else:
-            self.apiendpoint = region
+        self.cache = None
+        self.apiendpoint = _AML_ENDPOINTS.get(region.upper(), region)
 
     def throw_api_exception(self, throw_exception=False):
         """
@@ -1404,7 +2168,42 @@ class AMLAPI:
 
         :param throw_exception: Throw exception upon API error, defaults to false
         """
-        self.throw_error = throw_exception is True
+        self.throw_error = bool(throw_exception)
+
+    def set_timeout(self, connect=3.05, read=120):
+        """
+        Set how long to wait for the connection to the API server, and for its response, before giving up.
+        Throttled requests are retried with backoff, the timeouts apply to each attempt.
+
+        :param connect: Seconds to wait for the connection, defaults to 3.05
+        :param read: Seconds to wait for the response, which includes searching the AML databases, defaults to 120
+        :raises ValueError: Invalid input argument
+        """
+        if connect <= 0 or read <= 0:
+            raise ValueError("Invalid timeout, please specify positive number of seconds.")
+
+        self.timeout = (connect, read)
+
+    def preconnect(self):
+        """
+        Connect to the API server in the background, so that the first API call does not have to wait for
+        DNS lookup, TCP and TLS handshakes. Call it right after initialization to overlap it with your own work.
+        """
+        _preconnect(self.session, self.apiendpoint)
+
+    def close(self):
+        """
+        Close idle connections of a session set on this client, they are reopened automatically by the next API call.
+        Clients using the shared session leave it open, as its connections are pooled for all clients.
+        """
+        if self.session is not None:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def set_aml_database(self, databases="au_dfat,ca_dfatd,ch_seco,eu_fsf,fr_tresor_gels_avoir,gb_hmt,ua_sfms,un_sc,us_ofac,eu_cor,eu_meps,global_politicians,interpol_red"):
         """
@@ -1427,6 +2226,33 @@ class AMLAPI:
 
         self.AMLEntityType = entity_type
 
+    def enable_cache(self, enabled=False, ttl=300, max_entries=1024, persistent=False):
+        """
+        Keep search results in memory so that repeating an identical search within the given time
+        is answered locally instead of sending another request. Empty results and errors are never cached.
+        Set environment variable IDANALYZER_NO_CACHE=1 to disable caching regardless of this setting.
+
+        :param enabled: Enable or disable result cache, defaults to False
+        :param ttl: Number of seconds a result is kept, defaults to 300
+        :param max_entries: Maximum number of results to keep in memory, defaults to 1024
+        :param persistent: Also store results in a SQLite database under ~/.idanalyzer so they are reused across runs, defaults to False
+        """
+        if not enabled or os.environ.get("IDANALYZER_NO_CACHE") == "1":
+            self.cache = None
+            return
+
+        namespace = ""
+        if persistent:
+            namespace = self.apiendpoint + " " + hashlib.sha1(self.apikey.encode("utf-8")).hexdigest()
+        self.cache = _ResultCache(ttl, max_entries, cache_path if persistent else None, namespace)
+
+    def clear_cache(self):
+        """
+        Discard all search results cached for this API key and region
+        """
+        if self.cache is not None:
+            self.cache.clear()
+
     def search_by_name(self, name="", country="", dob=""):
         """
         Search AML Database using a person or company's name or alias
@@ -1461,16 +2287,102 @@ class AMLAPI:
 
         return self.__api({"documentnumber": document_number, "country": country, "dob": dob})
 
+    def search_many(self, queries, max_workers=8):
+        """
+        Perform multiple AML searches concurrently, so that the total time is close to that of the slowest search.
+
+        :param queries: List of (search type, value) tuples, search type is 'name' or 'id',
+            for example [("name", "Joe Biden"), ("id", "AALH750218HBCLPC02")]
+        :param max_workers: Maximum number of searches in progress at the same time, defaults to 8
+        :return AML match results in the same order as the queries
+        :rtype list
+        :raises ValueError: Invalid input argument
+        :raises APIError: API Error
+        """
+        searches = []
+        for search_type, value in queries:
+            if search_type == "name":
+                searches.append((self.search_by_name, value))
+            elif search_type == "id":
+                searches.append((self.search_by_id_number, value))
+            else:
+                raise ValueError("Invalid search type, 'name' or 'id' accepted.")
+
+        return self.__run_searches([(search, (value,)) for search, value in searches], max_workers)
+
+    def search_batch(self, queries, max_workers=8):
+        """
+        Perform up to 100 AML searches described as dictionaries, the searches are sent concurrently.
+        A search that fails does not stop the others, its place in the results holds {"error": {...}} instead.
+
+        :param queries: List of dictionaries with keys 'type' ('name' or 'id'), 'q' (name or document number),
+            and optional 'country' and 'dob', for example [{"type": "name", "q": "Joe Biden", "country": "US"}].
+            Other keys are rejected, the AML database and entity type set on this client apply to every search
+        :param max_workers: Maximum number of searches in progress at the same time, defaults to 8
+        :return AML match results or errors in the same order as the queries
+        :rtype list
+        :raises ValueError: Invalid input argument
+        """
+        if len(queries) > 100:
+            raise ValueError("Too many queries, at most 100 searches accepted per batch.")
+
+        searches = []
+        for query in queries:
+            unknown = set(query) - _AML_QUERY_KEYS
+            if unknown:
+                raise ValueError("Invalid query key '%s', 'type', 'q', 'country' and 'dob' accepted."
+                                 % sorted(unknown, key=str)[0])
+            search_type = query.get("type")
+            if search_type == "name":
+                search = self.search_by_name
+            elif search_type == "id":
+                search = self.search_by_id_number
+            else:
+                raise ValueError("Invalid search type, 'name' or 'id' accepted.")
+            searches.append((search, (query.get("q", ""), query.get("country", ""), query.get("dob", ""))))
+
+        return self.__run_searches(searches, max_workers, True)
+
+    def __run_searches(self, searches, max_workers, keep_going=False):
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError("Invalid max workers, please specify a positive integer.")
+
+        if not searches:
+            return []
+
+        def run(search):
+            function, arguments = search
+            if not keep_going:
+                return function(*arguments)
+            try:
+                return function(*arguments)
+            except APIError as e:
+                return {"error": e.args[0]}
+            except (ValueError, IOError) as e:
+                return {"error": {"message": str(e)}}
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(searches))) as executor:
+            return list(executor.map(run, searches))
+
     def __api(self, payload=None):
-        if not payload:
-            payload = {}
-        payload['database'] = self.AMLDatabases
-        payload['entity'] = self.AMLEntityType
+        payload = dict(payload or (), database=self.AMLDatabases, entity=self.AMLEntityType)
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = tuple(sorted(payload.items()))
+            result = self.cache.get(cache_key)
+            if result is not None:
+                return result
+
         payload['apikey'] = self.apikey
         payload['client'] = client_library
-        r = requests.post(self.apiendpoint, data=payload)
-        r.raise_for_status()
-        result = r.json()
+        r = _post(self.session, self.apiendpoint, payload, timeout=self.timeout)
+        result = _decode_response(r)
+
+        if cache_key is not None and not result.get('error') and result.get('items'):
+            self.cache.set(cache_key, result)
 
         if not self.throw_error:
             return result
@@ -20,14 +20,15 @@ setup(
     long_description=LONG_DESCRIPTION,
     long_description_content_type='text/markdown',
     packages=find_packages(),
+    python_requires='>=3.7',
     install_requires=['requests'],
+    extras_require={'speedups': ['orjson'], 'qrcode': ['segno'], 'imaging': ['Pillow']},
     keywords=['id card', 'driver license', 'passport', 'id verification', 'identification card', 'identity document', 'mrz', 'pdf417', 'aamva', "aml", "pep", "sign document"],
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Intended Audience :: Information Technology",
         "Intended Audience :: Financial and Insurance Industry",
         "Intended Audience :: Telecommunications Industry",
-        "Programming Language :: Python :: 2",
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
         "Topic :: Security",